@@ -13,6 +13,8 @@ https://docs.djangoproject.com/en/2.2/ref/settings/
 import os
 import django
 
+import qr_code
+
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 from qr_code.qrcode import constants
 
@@ -25,9 +27,10 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 SECRET_KEY = "8l4)()f1&tg*dtxh6whlew#k-d5&79npe#j_dg9l0b)m8^g#8u"
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = os.environ.get("DJANGO_DEBUG", "1") == "1"
 
-ALLOWED_HOSTS = []
+# Comma separated list of host names, only required when DEBUG is off.
+ALLOWED_HOSTS = [host for host in os.environ.get("DJANGO_ALLOWED_HOSTS", "").split(",") if host]
 
 # Application definition
 
@@ -114,6 +117,17 @@ CACHES = {
     "qr-code": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "qr-code-cache", "TIMEOUT": 3600},
 }
 
+# Share the QR code cache between worker processes when a Memcached server is available (e.g. "memcached:11211").
+MEMCACHED_LOCATION = os.environ.get("MEMCACHED_LOCATION")
+if MEMCACHED_LOCATION:
+    CACHES["qr-code"] = {
+        "BACKEND": "django.core.cache.backends.memcached.PyMemcacheCache",
+        "LOCATION": MEMCACHED_LOCATION,
+        "TIMEOUT": 3600,
+        # Cached images depend on the version of the app.
+        "KEY_PREFIX": f"qr-code-{qr_code.__version__}",
+    }
+
 # Django QR Code specific options.
 QR_CODE_CACHE_ALIAS = "qr-code"
 QR_CODE_URL_PROTECTION = {
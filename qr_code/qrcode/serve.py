@@ -1,4 +1,6 @@
 import base64
+import functools
+import hashlib
 import urllib.parse
 from collections.abc import Mapping
 from datetime import datetime
@@ -67,10 +69,16 @@ def _make_random_token() -> str:
 _RANDOM_TOKEN = _make_random_token()
 
 
+@functools.lru_cache(maxsize=4)
+def get_url_protection_signer(signing_key, signing_salt) -> Signer:
+    """Returns the signer for the given signing key and salt. Signers are stateless and thus shared between calls."""
+    return Signer(key=signing_key, salt=signing_salt)
+
+
 def get_qr_url_protection_signed_token(qr_code_options: QRCodeOptions):
     """Generate a signed token to handle view protection."""
     url_protection_options = get_url_protection_options()
-    signer = Signer(key=url_protection_options[constants.SIGNING_KEY], salt=url_protection_options[constants.SIGNING_SALT])
+    signer = get_url_protection_signer(url_protection_options[constants.SIGNING_KEY], url_protection_options[constants.SIGNING_SALT])
     token = signer.sign(get_qr_url_protection_token(qr_code_options, _RANDOM_TOKEN))
     return token
 
@@ -100,7 +108,12 @@ def get_qr_url_protection_token(qr_code_options, random_token):
 
 
 def qr_code_etag(request) -> str:
-    return f'"{request.path}:{request.GET.urlencode()}:version_{constants.QR_CODE_GENERATION_VERSION_DATE.isoformat()}"'
+    """Return the ETag of a QR code image.
+
+    The ETag only depends on the requested URL, so that conditional requests are answered without generating the image.
+    """
+    etag_data = f"{request.get_full_path()}:version_{constants.QR_CODE_GENERATION_VERSION_DATE.isoformat()}"
+    return f'"{hashlib.blake2b(etag_data.encode("utf-8"), digest_size=16).hexdigest()}"'
 
 
 def qr_code_last_modified(_request) -> datetime:
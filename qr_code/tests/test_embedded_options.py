@@ -8,13 +8,13 @@ from qr_code.templatetags.qr_code import qr_from_text, qr_for_email
 from qr_code.tests import (
     TEST_TEXT,
     REFRESH_REFERENCE_IMAGES,
-    IMAGE_TAG_BASE64_DATA_RE,
     get_base64_png_image_template,
     get_base64_svg_image_template,
 )
 from qr_code.tests.utils import (
+    get_base64_png_content_from_file_name,
+    get_image_data_from_tag,
     write_png_content_to_file,
-    get_png_content_from_file_name,
     write_svg_content_to_file,
     get_svg_content_from_file_name,
 )
@@ -45,10 +45,8 @@ class TestQREmbeddedImageResult(SimpleTestCase):
             qr2 = qr_from_text(TEST_TEXT, image_format="png", alt_text=alt_text)
             qr3 = qr_from_text(TEST_TEXT, options=QRCodeOptions(image_format="png"), alt_text=alt_text)
             if REFRESH_REFERENCE_IMAGES:
-                match = IMAGE_TAG_BASE64_DATA_RE.search(qr1)
-                source_image_data = match.group("data")
-                write_png_content_to_file(result_file_name, base64.b64decode(source_image_data))
-            result = base64.b64encode(get_png_content_from_file_name(result_file_name)).decode("utf-8")
+                write_png_content_to_file(result_file_name, get_image_data_from_tag(qr1))
+            result = get_base64_png_content_from_file_name(result_file_name)
             self.assertEqual(qr1, qr2)
             self.assertEqual(qr1, qr3)
             self.assertEqual(qr1, get_base64_png_image_template(alt_text) % result)
@@ -64,10 +62,8 @@ class TestQREmbeddedImageResult(SimpleTestCase):
             qr2 = qr_from_text(TEST_TEXT, image_format="png", class_names=class_names)
             qr3 = qr_from_text(TEST_TEXT, options=QRCodeOptions(image_format="png"), class_names=class_names)
             if REFRESH_REFERENCE_IMAGES:
-                match = IMAGE_TAG_BASE64_DATA_RE.search(qr1)
-                source_image_data = match.group("data")
-                write_png_content_to_file(result_file_name, base64.b64decode(source_image_data))
-            result = base64.b64encode(get_png_content_from_file_name(result_file_name)).decode("utf-8")
+                write_png_content_to_file(result_file_name, get_image_data_from_tag(qr1))
+            result = get_base64_png_content_from_file_name(result_file_name)
             self.assertEqual(qr1, qr2)
             self.assertEqual(qr1, qr3)
             self.assertEqual(qr1, get_base64_png_image_template(class_names=class_names) % result)
@@ -79,10 +75,8 @@ class TestQREmbeddedImageResult(SimpleTestCase):
             qr2 = qr_for_email(test_mail, image_format="png", class_names=class_names)
             qr3 = qr_for_email(test_mail, options=QRCodeOptions(image_format="png"), class_names=class_names)
             if REFRESH_REFERENCE_IMAGES:
-                match = IMAGE_TAG_BASE64_DATA_RE.search(qr1)
-                source_image_data = match.group("data")
-                write_png_content_to_file(result_file_name, base64.b64decode(source_image_data))
-            result = base64.b64encode(get_png_content_from_file_name(result_file_name)).decode("utf-8")
+                write_png_content_to_file(result_file_name, get_image_data_from_tag(qr1))
+            result = get_base64_png_content_from_file_name(result_file_name)
             self.assertEqual(qr1, qr2)
             self.assertEqual(qr1, qr3)
             self.assertEqual(qr1, get_base64_png_image_template(class_names=class_names, alt_text="mailto:test@domain.com") % result)
@@ -98,9 +92,7 @@ class TestQREmbeddedImageResult(SimpleTestCase):
             qr2 = qr_from_text(TEST_TEXT, image_format="svg", alt_text=alt_text, use_data_uri_for_svg=True)
             qr3 = qr_from_text(TEST_TEXT, options=QRCodeOptions(image_format="svg"), alt_text=alt_text, use_data_uri_for_svg=True)
             if REFRESH_REFERENCE_IMAGES:
-                match = IMAGE_TAG_BASE64_DATA_RE.search(qr1)
-                source_image_data = match.group("data")
-                write_svg_content_to_file(result_file_name, base64.b64decode(source_image_data).decode("utf-8"))
+                write_svg_content_to_file(result_file_name, get_image_data_from_tag(qr1).decode("utf-8"))
             result = get_svg_content_from_file_name(result_file_name)
             self.assertEqual(qr1, qr2)
             self.assertEqual(qr1, qr3)
@@ -117,9 +109,7 @@ class TestQREmbeddedImageResult(SimpleTestCase):
             qr2 = qr_from_text(TEST_TEXT, image_format="svg", class_names=class_names, use_data_uri_for_svg=True)
             qr3 = qr_from_text(TEST_TEXT, options=QRCodeOptions(image_format="svg"), class_names=class_names, use_data_uri_for_svg=True)
             if REFRESH_REFERENCE_IMAGES:
-                match = IMAGE_TAG_BASE64_DATA_RE.search(qr1)
-                source_image_data = match.group("data")
-                write_svg_content_to_file(result_file_name, base64.b64decode(source_image_data).decode("utf-8"))
+                write_svg_content_to_file(result_file_name, get_image_data_from_tag(qr1).decode("utf-8"))
             result = get_svg_content_from_file_name(result_file_name)
             self.assertEqual(qr1, qr2)
             self.assertEqual(qr1, qr3)
@@ -134,10 +124,8 @@ class TestQREmbeddedImageResult(SimpleTestCase):
             qr2 = qr_for_email(test_mail, image_format="png", class_names=class_names)
             qr3 = qr_for_email(test_mail, options=QRCodeOptions(image_format="png"), class_names=class_names)
             if REFRESH_REFERENCE_IMAGES:
-                match = IMAGE_TAG_BASE64_DATA_RE.search(qr1)
-                source_image_data = match.group("data")
-                write_png_content_to_file(result_file_name, base64.b64decode(source_image_data))
-            result = base64.b64encode(get_png_content_from_file_name(result_file_name)).decode("utf-8")
+                write_png_content_to_file(result_file_name, get_image_data_from_tag(qr1))
+            result = get_base64_png_content_from_file_name(result_file_name)
             self.assertEqual(qr1, qr2)
             self.assertEqual(qr1, qr3)
             self.assertEqual(qr1, get_base64_png_image_template(alt_text="mailto:test@domain.com", class_names=class_names) % result)
@@ -153,9 +141,7 @@ class TestQREmbeddedImageResult(SimpleTestCase):
             qr3 = qr_from_text(TEST_TEXT, options=QRCodeOptions(image_format="svg"), use_data_uri_for_svg=use_data_uri_for_svg)
             if REFRESH_REFERENCE_IMAGES:
                 if use_data_uri_for_svg:
-                    match = IMAGE_TAG_BASE64_DATA_RE.search(qr1)
-                    source_image_data = match.group("data")
-                    write_svg_content_to_file(result_file_name, base64.b64decode(source_image_data).decode("utf-8"))
+                    write_svg_content_to_file(result_file_name, get_image_data_from_tag(qr1).decode("utf-8"))
                 else:
                     write_svg_content_to_file(result_file_name, qr1)
             result = get_svg_content_from_file_name(result_file_name)
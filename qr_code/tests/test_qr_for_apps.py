@@ -1,14 +1,12 @@
 """Tests for qr_code application."""
-import base64
 import datetime
 
 from dataclasses import asdict
 from datetime import date
 
 import zoneinfo
-from django.template import Template, Context
+from django.template import Context
 from django.test import SimpleTestCase
-from django.utils.safestring import mark_safe
 
 from qr_code.qrcode.utils import (
     ContactDetail,
@@ -22,13 +20,15 @@ from qr_code.qrcode.utils import (
     EventTransparency,
     EventStatus,
 )
-from qr_code.tests import REFRESH_REFERENCE_IMAGES, IMAGE_TAG_BASE64_DATA_RE
+from qr_code.tests import REFRESH_REFERENCE_IMAGES
 from qr_code.tests.utils import (
+    get_compiled_template,
     write_svg_content_to_file,
     get_svg_content_from_file_name,
     minimal_svg,
     get_png_content_from_file_name,
     write_png_content_to_file,
+    get_image_data_from_tag,
 )
 
 US_EASTERN_TZ = zoneinfo.ZoneInfo("America/New_York")
@@ -320,8 +320,7 @@ class TestQRForApplications(SimpleTestCase):
 
     @staticmethod
     def _get_rendered_template(template_source, template_context):
-        html_source = mark_safe("{% load qr_code %}" + template_source)
-        template = Template(html_source)
+        template = get_compiled_template(template_source)
         context = Context()
         if template_context:
             context.update(template_context)
@@ -342,9 +341,7 @@ class TestQRForApplications(SimpleTestCase):
         for test_data in tests_data:
             print("Testing template: %s" % test_data["source"])
             source_image_data = TestQRForApplications._get_rendered_template(test_data["source"], test_data.get("template_context"))
-            match = IMAGE_TAG_BASE64_DATA_RE.search(source_image_data)
-            source_image_data = match.group("data")
-            source_image_data = base64.b64decode(source_image_data)
+            source_image_data = get_image_data_from_tag(source_image_data)
             if REFRESH_REFERENCE_IMAGES:
                 write_png_content_to_file(test_data["ref_file_name"], source_image_data)
             ref_image_data = get_png_content_from_file_name(test_data["ref_file_name"])
@@ -7,9 +7,8 @@ from itertools import product
 from django.conf import settings
 from django.contrib.auth.models import AnonymousUser, User
 from django.core.cache import caches
-from django.template import Template, Context
+from django.template import Context
 from django.test import SimpleTestCase, override_settings
-from django.utils.safestring import mark_safe
 from django.utils.html import escape
 
 from qr_code.qrcode.maker import make_embedded_qr_code
@@ -24,9 +23,11 @@ from qr_code.tests import (
     OVERRIDE_CACHES_SETTING,
     COMPLEX_TEST_TEXT,
     get_base64_png_image_template,
-    IMAGE_TAG_BASE64_DATA_RE,
 )
 from qr_code.tests.utils import (
+    get_compiled_template,
+    get_base64_png_content_from_file_name,
+    get_image_data_from_tag,
     write_svg_content_to_file,
     write_png_content_to_file,
     get_svg_content_from_file_name,
@@ -222,6 +223,15 @@ class TestQRUrlFromDataResult(SimpleTestCase):
         response = self.client.get(url_with_invalid_signature_token)
         self.assertEqual(response.status_code, 403)
 
+    def test_url_with_integer_data(self):
+        url = make_qr_code_url(-1234, force_text=False, cache_enabled=False)
+        self.assertIn("int=-1234", url)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        for invalid_value in ("12.5", "--12", "%C2%B2", ""):
+            response = self.client.get(url.replace("int=-1234", f"int={invalid_value}"))
+            self.assertEqual(response.status_code, 400)
+
     def test_url_with_wrong_signature_token(self):
         valid_url_with_signature_token_for_size_10 = make_qr_code_url(TEST_TEXT_AS_UTF_8, QRCodeOptions(size=10), force_text=False)
         valid_url_with_signature_token_for_size_8 = make_qr_code_url(TEST_TEXT_AS_UTF_8, QRCodeOptions(size=8), force_text=False)
@@ -632,8 +642,7 @@ class TestQRFromDataSvgResult(SimpleTestCase):
 
         for test_data in tests_data:
             print("Testing template: %s" % test_data["source"])
-            html_source = mark_safe("{% load qr_code %}" + test_data["source"])
-            template = Template(html_source)
+            template = get_compiled_template(test_data["source"])
             context = Context(dict(data=COMPLEX_TEST_TEXT_AS_UTF_8))
             source_image_data = template.render(context)
             if REFRESH_REFERENCE_IMAGES:
@@ -650,8 +659,7 @@ class TestQRFromDataSvgResult(SimpleTestCase):
 
         for test_data in tests_data:
             print("Testing template: %s" % test_data["source"])
-            html_source = mark_safe("{% load qr_code %}" + test_data["source"])
-            template = Template(html_source)
+            template = get_compiled_template(test_data["source"])
             context = Context(dict(data=COMPLEX_TEST_TEXT_AS_UTF_8))
             source_image_data = template.render(context)
             if REFRESH_REFERENCE_IMAGES:
@@ -684,8 +692,7 @@ class TestQRFromDataSvgResult(SimpleTestCase):
 
         for test_data in tests_data:
             print("Testing template: %s" % test_data["source"])
-            html_source = mark_safe("{% load qr_code %}" + test_data["source"])
-            template = Template(html_source)
+            template = get_compiled_template(test_data["source"])
             context = Context(dict(data=COMPLEX_TEST_TEXT_AS_ISO_8859_1))
             source_image_data = template.render(context)
             if REFRESH_REFERENCE_IMAGES:
@@ -704,8 +711,7 @@ class TestQRFromDataSvgResult(SimpleTestCase):
 
         for test_data in tests_data:
             print("Testing template: %s" % test_data["source"])
-            html_source = mark_safe("{% load qr_code %}" + test_data["source"])
-            template = Template(html_source)
+            template = get_compiled_template(test_data["source"])
             context = Context(dict(data=COMPLEX_TEST_TEXT_AS_UTF_8))
             source_image_data = template.render(context)
             if REFRESH_REFERENCE_IMAGES:
@@ -728,8 +734,7 @@ class TestQRFromDataSvgResult(SimpleTestCase):
 
         for test_data in tests_data:
             print("Testing template: %s" % test_data["source"])
-            html_source = mark_safe("{% load qr_code %}" + test_data["source"])
-            template = Template(html_source)
+            template = get_compiled_template(test_data["source"])
             data = COMPLEX_TEST_TEXT.encode(encoding=test_data["encoding"])
             context = Context(dict(data=data))
             source_image_data = template.render(context)
@@ -759,8 +764,7 @@ class TestQRFromDataSvgResult(SimpleTestCase):
 
         for i, test_data in enumerate(tests_data):
             print("Testing template: %s" % test_data["source"])
-            html_source = mark_safe("{% load qr_code %}" + test_data["source"])
-            template = Template(html_source)
+            template = get_compiled_template(test_data["source"])
             context = Context(dict(data=data_for_mode[i], encoding=encodings[i]))
             source_image_data = template.render(context)
             if REFRESH_REFERENCE_IMAGES:
@@ -792,10 +796,8 @@ class TestQRFromDataPngResult(SimpleTestCase):
             qr2 = qr_from_data(TEST_TEXT_AS_UTF_8, size=size, image_format="png")
             qr3 = qr_from_data(TEST_TEXT_AS_UTF_8, options=QRCodeOptions(size=size, image_format="png"), force_text=False)
             if REFRESH_REFERENCE_IMAGES:
-                match = IMAGE_TAG_BASE64_DATA_RE.search(qr1)
-                source_image_data = match.group("data")
-                write_png_content_to_file(result_file_name, base64.b64decode(source_image_data))
-            result = base64.b64encode(get_png_content_from_file_name(result_file_name)).decode("utf-8")
+                write_png_content_to_file(result_file_name, get_image_data_from_tag(qr1))
+            result = get_base64_png_content_from_file_name(result_file_name)
             self.assertEqual(qr1, qr2)
             self.assertEqual(qr1, qr3)
             self.assertEqual(qr1, get_base64_png_image_template() % result)
@@ -814,10 +816,8 @@ class TestQRFromDataPngResult(SimpleTestCase):
             qr4 = qr_from_data(TEST_TEXT_AS_UTF_8, options=QRCodeOptions(version=version, image_format="PNG"))
             result_file_name = f"{base_file_name}_{version_name}"
             if REFRESH_REFERENCE_IMAGES:
-                match = IMAGE_TAG_BASE64_DATA_RE.search(qr1)
-                source_image_data = match.group("data")
-                write_png_content_to_file(result_file_name, base64.b64decode(source_image_data))
-            result = base64.b64encode(get_png_content_from_file_name(result_file_name)).decode("utf-8")
+                write_png_content_to_file(result_file_name, get_image_data_from_tag(qr1))
+            result = get_base64_png_content_from_file_name(result_file_name)
             self.assertEqual(qr1, qr2)
             self.assertEqual(qr1, qr3)
             self.assertEqual(qr1, qr4)
@@ -837,8 +837,7 @@ class TestQRFromDataPngResult(SimpleTestCase):
 
         for test_data in tests_data:
             print("Testing template: %s" % test_data["source"])
-            html_source = mark_safe("{% load qr_code %}" + test_data["source"])
-            template = Template(html_source)
+            template = get_compiled_template(test_data["source"])
             context = Context(dict(data=COMPLEX_TEST_TEXT_AS_UTF_8))
             source_image = template.render(context).strip()
             source_image_data = source_image[32 : -len('" alt="%s"' % escape(COMPLEX_TEST_TEXT))]
@@ -858,8 +857,7 @@ class TestQRFromDataPngResult(SimpleTestCase):
 
         for test_data in tests_data:
             print("Testing template: %s" % test_data["source"])
-            html_source = mark_safe("{% load qr_code %}" + test_data["source"])
-            template = Template(html_source)
+            template = get_compiled_template(test_data["source"])
             context = Context(dict(data=COMPLEX_TEST_TEXT_AS_UTF_8))
             source_image = template.render(context).strip()
             source_image_data = source_image[32 : -len('" alt="%s"' % escape(COMPLEX_TEST_TEXT))]
@@ -880,8 +878,7 @@ class TestQRFromDataPngResult(SimpleTestCase):
 
         for test_data in tests_data:
             print("Testing template: %s" % test_data["source"])
-            html_source = mark_safe("{% load qr_code %}" + test_data["source"])
-            template = Template(html_source)
+            template = get_compiled_template(test_data["source"])
             context = Context(dict(data=COMPLEX_TEST_TEXT_AS_ISO_8859_1))
             source_image = template.render(context).strip()
             source_image_data = source_image[32 : -len('" alt="%s"' % escape(COMPLEX_TEST_TEXT))]
@@ -902,8 +899,7 @@ class TestQRFromDataPngResult(SimpleTestCase):
 
         for test_data in tests_data:
             print("Testing template: %s" % test_data["source"])
-            html_source = mark_safe("{% load qr_code %}" + test_data["source"])
-            template = Template(html_source)
+            template = get_compiled_template(test_data["source"])
             context = Context(dict(data=COMPLEX_TEST_TEXT_AS_UTF_8))
             source_image = template.render(context).strip()
             source_image_data = source_image[32 : -len('" alt="%s"' % escape(COMPLEX_TEST_TEXT))]
@@ -928,8 +924,7 @@ class TestQRFromDataPngResult(SimpleTestCase):
 
         for test_data in tests_data:
             print("Testing template: %s" % test_data["source"])
-            html_source = mark_safe("{% load qr_code %}" + test_data["source"])
-            template = Template(html_source)
+            template = get_compiled_template(test_data["source"])
             data = COMPLEX_TEST_TEXT.encode(encoding=test_data["encoding"])
             context = Context(dict(data=data))
             source_image = template.render(context).strip()
@@ -963,8 +958,7 @@ class TestQRFromDataPngResult(SimpleTestCase):
 
         for i, test_data in enumerate(tests_data):
             print("Testing template: %s" % test_data["source"])
-            html_source = mark_safe("{% load qr_code %}" + test_data["source"])
-            template = Template(html_source)
+            template = get_compiled_template(test_data["source"])
             context = Context(dict(data=data_for_mode[i], encoding=encodings[i]))
             source_image = template.render(context).strip()
             source_image_data = source_image[32 : source_image.index('" alt="')]
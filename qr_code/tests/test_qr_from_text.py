@@ -1,24 +1,26 @@
 """Tests for qr_code application."""
 import base64
+import gzip
 import hashlib
 import re
 from decimal import Decimal
 
 from itertools import product
+from unittest import mock
 
 from django.conf import settings
 from django.contrib.auth.models import AnonymousUser, User
 from django.core.cache import caches
-from django.template import Template, Context
+from django.template import Context
 from django.test import SimpleTestCase, override_settings
-from django.utils.safestring import mark_safe
 from django.utils.html import escape
 
-from qr_code.qrcode.maker import make_embedded_qr_code
+from qr_code.qrcode.maker import make_embedded_qr_code, make_qr_code_image
 from qr_code.qrcode.constants import ERROR_CORRECTION_DICT
 from qr_code.qrcode.serve import make_qr_code_url, allows_external_request_from_user
 from qr_code.qrcode.utils import QRCodeOptions
 from qr_code.templatetags.qr_code import qr_from_text, qr_url_from_text
+from qr_code import views
 
 from qr_code.tests import (
     REFRESH_REFERENCE_IMAGES,
@@ -26,9 +28,11 @@ from qr_code.tests import (
     OVERRIDE_CACHES_SETTING,
     COMPLEX_TEST_TEXT,
     get_base64_png_image_template,
-    IMAGE_TAG_BASE64_DATA_RE,
 )
 from qr_code.tests.utils import (
+    get_compiled_template,
+    get_base64_png_content_from_file_name,
+    get_image_data_from_tag,
     write_svg_content_to_file,
     write_png_content_to_file,
     get_svg_content_from_file_name,
@@ -152,6 +156,20 @@ class TestQRUrlFromTextResult(SimpleTestCase):
     def test_png_with_cache_but_no_alias(self):
         self.test_png_url()
 
+    @override_settings(CACHES=OVERRIDE_CACHES_SETTING)
+    def test_image_cache_shared_across_urls(self):
+        caches[settings.QR_CODE_CACHE_ALIAS].clear()
+        url = make_qr_code_url(TEST_TEXT, QRCodeOptions(image_format="png", size=1))
+        path, query = url.split("?")
+        reordered_url = path + "?" + "&".join(reversed(query.split("&")))
+        with mock.patch("qr_code.views.make_qr_code_image", wraps=make_qr_code_image) as make_image:
+            response1 = self.client.get(url)
+            response2 = self.client.get(reordered_url)
+        self.assertEqual(response1.status_code, 200)
+        self.assertEqual(response2.status_code, 200)
+        self.assertEqual(response1.content, response2.content)
+        self.assertEqual(make_image.call_count, 1)
+
     @override_settings(
         QR_CODE_URL_PROTECTION=dict(
             TOKEN_LENGTH=30,
@@ -213,6 +231,100 @@ class TestQRUrlFromTextResult(SimpleTestCase):
         response = self.client.get(url_with_invalid_signature_token)
         self.assertEqual(response.status_code, 403)
 
+    @override_settings(QR_CODE_URL_PROTECTION=dict(ALLOWS_EXTERNAL_REQUESTS_FOR_REGISTERED_USER=lambda user: True))
+    def test_cache_control_headers(self):
+        response = self.client.get(make_qr_code_url(TEST_TEXT, cache_enabled=False))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response["Cache-Control"].split(", ")), {"public", "max-age=31536000", "immutable"})
+        self.assertEqual(response["Vary"], "Accept-Encoding")
+        response = self.client.get(make_qr_code_url(TEST_TEXT, cache_enabled=False, url_signature_enabled=False))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response["Cache-Control"].split(", ")), {"private", "max-age=0", "must-revalidate"})
+
+    def test_cache_control_headers_with_page_cache(self):
+        caches[settings.QR_CODE_CACHE_ALIAS].clear()
+        url = make_qr_code_url(TEST_TEXT)
+        for _ in range(2):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            # The timeout of the page cache does not cap the max age.
+            self.assertEqual(set(response["Cache-Control"].split(", ")), {"public", "max-age=31536000", "immutable"})
+            self.assertFalse(response.has_header("Expires"))
+
+    def test_cache_control_headers_on_not_modified_response(self):
+        url = make_qr_code_url(TEST_TEXT, cache_enabled=False)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=self.client.get(url)["ETag"])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(set(response["Cache-Control"].split(", ")), {"public", "max-age=31536000", "immutable"})
+        self.assertEqual(response["Vary"], "Accept-Encoding")
+
+    def test_url_without_token_is_served_from_page_cache(self):
+        caches[settings.QR_CODE_CACHE_ALIAS].clear()
+        url = make_qr_code_url(TEST_TEXT, url_signature_enabled=False)
+        with mock.patch("qr_code.views._make_qr_code_image_with_cache", wraps=views._make_qr_code_image_with_cache) as make_image:
+            response1 = self.client.get(url)
+            response2 = self.client.get(url)
+        self.assertEqual(response1.status_code, 200)
+        self.assertEqual(response2.status_code, 200)
+        self.assertEqual(response1.content, response2.content)
+        self.assertEqual(make_image.call_count, 1)
+        self.assertEqual(set(response2["Cache-Control"].split(", ")), {"private", "max-age=0", "must-revalidate"})
+        self.assertFalse(response2.has_header("Expires"))
+
+    def test_svg_image_is_a_single_path(self):
+        response = self.client.get(make_qr_code_url(TEST_TEXT, cache_enabled=False))
+        self.assertEqual(response.status_code, 200)
+        image_data = response.content.decode("utf-8")
+        # One path for the light background and one path for all the dark modules.
+        self.assertEqual(image_data.count("<path"), 2)
+        self.assertEqual(image_data.count('<path class="qrline"'), 1)
+        self.assertNotIn("<rect", image_data)
+
+    def test_url_with_non_integer_cache_enabled(self):
+        url = make_qr_code_url(TEST_TEXT, cache_enabled=False)
+        response = self.client.get(url.replace("cache_enabled=0", "cache_enabled=no-cache"))
+        self.assertEqual(response.status_code, 200)
+
+    def test_conditional_get_does_not_generate_image(self):
+        url = make_qr_code_url(TEST_TEXT, cache_enabled=False)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        with mock.patch("qr_code.views.make_qr_code_image", wraps=make_qr_code_image) as make_image:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(make_image.call_count, 0)
+
+    def test_url_with_unknown_query_argument(self):
+        url = make_qr_code_url(TEST_TEXT, cache_enabled=False)
+        response = self.client.get(url + "&foo=bar")
+        self.assertEqual(response.status_code, 400)
+
+    def test_svg_url_with_gzip_encoding(self):
+        url = make_qr_code_url(TEST_TEXT, QRCodeOptions(size=1), cache_enabled=False)
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING="gzip, deflate")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(response["Content-Length"], str(len(response.content)))
+        self.assertTrue(response["ETag"].startswith("W/"))
+        image_data = gzip.decompress(response.content).decode("utf-8")
+        self.assertEqual(image_data, TestQRUrlFromTextResult._get_reference_result_for_default_svg())
+        # The HTTP 304 response carries the same weak ETag as the compressed image.
+        not_modified_response = self.client.get(url, HTTP_ACCEPT_ENCODING="gzip, deflate", HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(not_modified_response.status_code, 304)
+        self.assertEqual(not_modified_response["ETag"], response["ETag"])
+        # PNG images are already compressed.
+        url = make_qr_code_url(TEST_TEXT, QRCodeOptions(size=1, image_format="png"), cache_enabled=False)
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING="gzip, deflate")
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header("Content-Encoding"))
+
+    def test_url_with_invalid_base64_text(self):
+        url = make_qr_code_url(TEST_TEXT, cache_enabled=False)
+        encoded_text = re.search(r"text=([^&]+)", url).group(1)
+        # Characters outside the base64 alphabet are rejected instead of being silently discarded.
+        response = self.client.get(url.replace(encoded_text, encoded_text + "%21"))
+        self.assertEqual(response.status_code, 400)
+
     def test_url_with_wrong_signature_token(self):
         valid_url_with_signature_token_for_size_10 = make_qr_code_url(TEST_TEXT, QRCodeOptions(size=10))
         valid_url_with_signature_token_for_size_8 = make_qr_code_url(TEST_TEXT, QRCodeOptions(size=8))
@@ -589,10 +701,8 @@ class TestQRFromTextSvgResult(SimpleTestCase):
         base_file_name = "qrfromtext_version"
         versions = [None, -1, 0, 41, "-1", "0", "41", "blabla", 1, "1", 2, "2", 4, "4"]
         version_names = ["default"] * 10 + ["2", "2", "4", "4"]
-        for i in range(len(versions)):
-            version = versions[i]
+        for version, version_name in zip(versions, version_names):
             print("Testing SVG with version %s" % version)
-            version_name = version_names[i]
             qr1 = make_embedded_qr_code(TEST_TEXT, QRCodeOptions(version=version))
             qr2 = qr_from_text(TEST_TEXT, version=version)
             qr3 = qr_from_text(TEST_TEXT, version=version, image_format="svg")
@@ -624,8 +734,7 @@ class TestQRFromTextSvgResult(SimpleTestCase):
 
         for test_data in tests_data:
             print("Testing template: %s" % test_data["source"])
-            html_source = mark_safe("{% load qr_code %}" + test_data["source"])
-            template = Template(html_source)
+            template = get_compiled_template(test_data["source"])
             context = Context()
             source_image_data = template.render(context)
             if REFRESH_REFERENCE_IMAGES:
@@ -645,8 +754,7 @@ class TestQRFromTextSvgResult(SimpleTestCase):
 
         for test_data in tests_data:
             print("Testing template: %s" % test_data["source"])
-            html_source = mark_safe("{% load qr_code %}" + test_data["source"])
-            template = Template(html_source)
+            template = get_compiled_template(test_data["source"])
             context = Context()
             source_image_data = template.render(context)
             if REFRESH_REFERENCE_IMAGES:
@@ -669,8 +777,7 @@ class TestQRFromTextSvgResult(SimpleTestCase):
 
         for test_data in tests_data:
             print("Testing template: %s" % test_data["source"])
-            html_source = mark_safe("{% load qr_code %}" + test_data["source"])
-            template = Template(html_source)
+            template = get_compiled_template(test_data["source"])
             context = Context()
             source_image_data = template.render(context)
             if REFRESH_REFERENCE_IMAGES:
@@ -689,8 +796,7 @@ class TestQRFromTextSvgResult(SimpleTestCase):
 
         for test_data in tests_data:
             print("Testing template: %s" % test_data["source"])
-            html_source = mark_safe("{% load qr_code %}" + test_data["source"])
-            template = Template(html_source)
+            template = get_compiled_template(test_data["source"])
             context = Context(dict(data=COMPLEX_TEST_TEXT))
             source_image_data = template.render(context)
             if REFRESH_REFERENCE_IMAGES:
@@ -730,8 +836,7 @@ class TestQRFromTextSvgResult(SimpleTestCase):
 
         for test_data in tests_data:
             print("Testing template: %s" % test_data["source"])
-            html_source = mark_safe("{% load qr_code %}" + test_data["source"])
-            template = Template(html_source)
+            template = get_compiled_template(test_data["source"])
             context = Context()
             source_image_data = template.render(context)
             if REFRESH_REFERENCE_IMAGES:
@@ -845,10 +950,8 @@ class TestQRFromTextPngResult(SimpleTestCase):
             qr2 = qr_from_text(TEST_TEXT, size=size, image_format="png")
             qr3 = qr_from_text(TEST_TEXT, options=QRCodeOptions(size=size, image_format="png"))
             if REFRESH_REFERENCE_IMAGES:
-                match = IMAGE_TAG_BASE64_DATA_RE.search(qr1)
-                source_image_data = match.group("data")
-                write_png_content_to_file(result_file_name, base64.b64decode(source_image_data))
-            result = base64.b64encode(get_png_content_from_file_name(result_file_name)).decode("utf-8")
+                write_png_content_to_file(result_file_name, get_image_data_from_tag(qr1))
+            result = get_base64_png_content_from_file_name(result_file_name)
             self.assertEqual(qr1, qr2)
             self.assertEqual(qr1, qr3)
             self.assertEqual(qr1, get_base64_png_image_template() % result)
@@ -857,24 +960,19 @@ class TestQRFromTextPngResult(SimpleTestCase):
         base_file_name = "qrfromtext_version"
         versions = [None, -1, 0, 41, "-1", "0", "41", "blabla", 1, "1", 2, "2", 4, "4"]
         version_names = ["default"] * 10 + ["2", "2", "4", "4"]
-        for i in range(len(versions)):
-            version = versions[i]
+        # The image format is case-insensitive whatever the version, check it once.
+        qr1 = make_embedded_qr_code(TEST_TEXT, QRCodeOptions(image_format="png"))
+        self.assertEqual(qr1, qr_from_text(TEST_TEXT, image_format="png"))
+        self.assertEqual(qr1, qr_from_text(TEST_TEXT, image_format="PNG"))
+        self.assertEqual(qr1, qr_from_text(TEST_TEXT, options=QRCodeOptions(image_format="PNG")))
+        for version, version_name in zip(versions, version_names):
             print("Testing PNG with version %s" % version)
-            version_name = version_names[i]
             qr1 = make_embedded_qr_code(TEST_TEXT, QRCodeOptions(version=version, image_format="png"))
-            qr2 = qr_from_text(TEST_TEXT, version=version, image_format="png")
-            qr3 = qr_from_text(TEST_TEXT, version=version, image_format="PNG")
-            qr4 = qr_from_text(TEST_TEXT, options=QRCodeOptions(version=version, image_format="PNG"))
             result_file_name = f"{base_file_name}_{version_name}"
+            source_image_data = get_image_data_from_tag(qr1)
             if REFRESH_REFERENCE_IMAGES:
-                match = IMAGE_TAG_BASE64_DATA_RE.search(qr1)
-                source_image_data = match.group("data")
-                write_png_content_to_file(result_file_name, base64.b64decode(source_image_data))
-            result = base64.b64encode(get_png_content_from_file_name(result_file_name)).decode("utf-8")
-            self.assertEqual(qr1, qr2)
-            self.assertEqual(qr1, qr3)
-            self.assertEqual(qr1, qr4)
-            self.assertEqual(qr1, get_base64_png_image_template() % result)
+                write_png_content_to_file(result_file_name, source_image_data)
+            self.assertEqual(source_image_data, get_png_content_from_file_name(result_file_name))
 
     def test_error_correction(self):
         file_base_name = "qrfromtext_error_correction"
@@ -888,13 +986,13 @@ class TestQRFromTextPngResult(SimpleTestCase):
                 )
             )
 
+        suffix_len = len('" alt="%s"' % escape(COMPLEX_TEST_TEXT))
         for test_data in tests_data:
             print("Testing template: %s" % test_data["source"])
-            html_source = mark_safe("{% load qr_code %}" + test_data["source"])
-            template = Template(html_source)
+            template = get_compiled_template(test_data["source"])
             context = Context()
             source_image = template.render(context).strip()
-            source_image_data = source_image[32 : -len('" alt="%s"' % escape(COMPLEX_TEST_TEXT))]
+            source_image_data = source_image[32:-suffix_len]
             source_image_data = base64.b64decode(source_image_data)
             if REFRESH_REFERENCE_IMAGES:
                 write_png_content_to_file(test_data["ref_file_name"], source_image_data)
@@ -911,13 +1009,13 @@ class TestQRFromTextPngResult(SimpleTestCase):
             )
             # tests_data.append(dict(source=f'{{% qr_from_text "{COMPLEX_TEST_TEXT}" image_format="png" eci="{eci}" %}}', ref_file_name=ref_file_name.lower()))
 
+        suffix_len = len('" alt="%s"' % escape(COMPLEX_TEST_TEXT))
         for test_data in tests_data:
             print("Testing template: %s" % test_data["source"])
-            html_source = mark_safe("{% load qr_code %}" + test_data["source"])
-            template = Template(html_source)
+            template = get_compiled_template(test_data["source"])
             context = Context()
             source_image = template.render(context).strip()
-            source_image_data = source_image[32 : -len('" alt="%s"' % escape(COMPLEX_TEST_TEXT))]
+            source_image_data = source_image[32:-suffix_len]
             source_image_data = base64.b64decode(source_image_data)
             if REFRESH_REFERENCE_IMAGES:
                 write_png_content_to_file(test_data["ref_file_name"], source_image_data)
@@ -943,13 +1041,13 @@ class TestQRFromTextPngResult(SimpleTestCase):
             )
             # tests_data.append(dict(source=f'{{% qr_from_text "{COMPLEX_TEST_TEXT}" image_format="png" micro="{micro}"%}}', ref_file_name=ref_file_name.lower()))
 
+        suffix_len = len('" alt="%s"' % escape(COMPLEX_TEST_TEXT))
         for test_data in tests_data:
             print("Testing template: %s" % test_data["source"])
-            html_source = mark_safe("{% load qr_code %}" + test_data["source"])
-            template = Template(html_source)
+            template = get_compiled_template(test_data["source"])
             context = Context()
             source_image = template.render(context).strip()
-            source_image_data = source_image[32 : -len('" alt="%s"' % escape(COMPLEX_TEST_TEXT))]
+            source_image_data = source_image[32:-suffix_len]
             source_image_data = base64.b64decode(source_image_data)
             if REFRESH_REFERENCE_IMAGES:
                 write_png_content_to_file(test_data["ref_file_name"], source_image_data)
@@ -965,10 +1063,10 @@ class TestQRFromTextPngResult(SimpleTestCase):
                 dict(source=f'{{% qr_from_text data image_format="png" boost_error={boost_error} %}}', ref_file_name=ref_file_name.lower())
             )
 
+        suffix_len = len('" alt="%s"' % escape(COMPLEX_TEST_TEXT))
         for test_data in tests_data:
             print("Testing template: %s" % test_data["source"])
-            html_source = mark_safe("{% load qr_code %}" + test_data["source"])
-            template = Template(html_source)
+            template = get_compiled_template(test_data["source"])
             context = Context(dict(data=COMPLEX_TEST_TEXT))
             source_image = template.render(context).strip()
 
@@ -977,7 +1075,7 @@ class TestQRFromTextPngResult(SimpleTestCase):
             # response = self.client.get(url)
             # new_image = base64.b64encode(response.content)
 
-            source_image_data = source_image[32 : -len('" alt="%s"' % escape(COMPLEX_TEST_TEXT))]
+            source_image_data = source_image[32:-suffix_len]
             source_image_data = base64.b64decode(source_image_data)
             if REFRESH_REFERENCE_IMAGES:
                 write_png_content_to_file(test_data["ref_file_name"], source_image_data)
@@ -1017,8 +1115,7 @@ class TestQRFromTextPngResult(SimpleTestCase):
         for test_data in tests_data:
             print("Testing template: %s" % test_data["source"])
             text = test_data["text"]
-            html_source = mark_safe("{% load qr_code %}" + test_data["source"])
-            template = Template(html_source)
+            template = get_compiled_template(test_data["source"])
             context = Context()
             source_image = template.render(context).strip()
             source_image_data = source_image[32 : -len('" alt="%s"' % escape(text))]
@@ -1031,10 +1128,8 @@ class TestQRFromTextPngResult(SimpleTestCase):
     def test_colors(self):
         def run_tests():
             if REFRESH_REFERENCE_IMAGES:
-                match = IMAGE_TAG_BASE64_DATA_RE.search(qr1)
-                source_image_data = match.group("data")
-                write_png_content_to_file(result_file_name, base64.b64decode(source_image_data))
-            result = base64.b64encode(get_png_content_from_file_name(result_file_name)).decode("utf-8")
+                write_png_content_to_file(result_file_name, get_image_data_from_tag(qr1))
+            result = get_base64_png_content_from_file_name(result_file_name)
             self.assertEqual(qr1, qr2)
             self.assertEqual(qr1, qr3)
             self.assertEqual(qr1, get_base64_png_image_template() % result)
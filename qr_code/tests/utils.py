@@ -1,14 +1,40 @@
+import base64
+import binascii
+import functools
 import os
 import re
 
-from qr_code.tests import PNG_REF_SUFFIX, SVG_REF_SUFFIX
+from django.template import Template
+from django.utils.safestring import mark_safe
+
+from qr_code.tests import PNG_REF_SUFFIX, SVG_REF_SUFFIX, IMAGE_TAG_BASE64_DATA_RE
+
+TOKEN_RE = re.compile(r"&?token=[^&]+")
+# Reference images are read and written in one block (the biggest ones are below 16 KB, well within the buffer).
+FILE_BUFFER_SIZE = 1 << 20
 
 
 def get_urls_without_token_for_comparison(*urls):
-    token_regex = re.compile(r"&?token=[^&]+")
-    simplified_urls = list(map(lambda x: token_regex.sub("", x), urls))
-    simplified_urls = list(map(lambda x: x.replace("?&", "?"), simplified_urls))
-    return simplified_urls
+    return [TOKEN_RE.sub("", url).replace("?&", "?") for url in urls]
+
+
+def get_image_data_from_tag(image_tag):
+    """Returns the decoded image data embedded as base64 data URI in the given image tag.
+
+    :rtype: bytes
+    """
+    return base64.b64decode(IMAGE_TAG_BASE64_DATA_RE.search(image_tag).group("data"))
+
+
+@functools.lru_cache(maxsize=256)
+def get_compiled_template(template_source):
+    """Returns the compiled template for the given source, loading the qr_code tags library.
+
+    Each distinct source is compiled once since a compiled template can be rendered with any context.
+
+    :rtype: django.template.Template
+    """
+    return Template(mark_safe("{% load qr_code %}" + template_source))
 
 
 def get_resources_path():
@@ -24,21 +50,48 @@ def minimal_svg(s):
     return s.replace('<?xml version="1.0" encoding="utf-8"?>\n', "").replace('xmlns="http://www.w3.org/2000/svg" ', "").strip()
 
 
+@functools.lru_cache(maxsize=None)
 def get_svg_content_from_file_name(base_file_name):
-    with open(os.path.join(get_resources_path(), base_file_name + SVG_REF_SUFFIX), encoding="utf-8") as file:
+    with open(os.path.join(get_resources_path(), base_file_name + SVG_REF_SUFFIX), encoding="utf-8", buffering=FILE_BUFFER_SIZE) as file:
         return file.read()
 
 
+@functools.lru_cache(maxsize=None)
 def get_png_content_from_file_name(base_file_name):
-    with open(os.path.join(get_resources_path(), base_file_name + PNG_REF_SUFFIX), "rb") as file:
-        return file.read()
+    # PNG reference images are only a few KB, read each in a single call with the size known upfront.
+    fd = os.open(
+        os.path.join(get_resources_path(), base_file_name + PNG_REF_SUFFIX),
+        os.O_RDONLY | getattr(os, "O_BINARY", 0) | getattr(os, "O_CLOEXEC", 0),
+    )
+    try:
+        size = os.fstat(fd).st_size
+        content = os.read(fd, size)
+        while len(content) < size:
+            chunk = os.read(fd, size - len(content))
+            if not chunk:
+                break
+            content += chunk
+        return content
+    finally:
+        os.close(fd)
+
+
+def get_base64_png_content_from_file_name(base_file_name):
+    """Returns the base64 encoded content of the PNG reference image, as embedded in a data URI.
+
+    :rtype: str
+    """
+    return binascii.b2a_base64(get_png_content_from_file_name(base_file_name), newline=False).decode("ascii")
 
 
 def write_svg_content_to_file(base_file_name, image_content):
-    with open(os.path.join(get_resources_path(), base_file_name + SVG_REF_SUFFIX), "wt", encoding="utf-8") as file:
+    with open(os.path.join(get_resources_path(), base_file_name + SVG_REF_SUFFIX), "wt", encoding="utf-8", buffering=FILE_BUFFER_SIZE) as file:
         file.write(image_content)
+    # Reference images may be refreshed while running the tests.
+    get_svg_content_from_file_name.cache_clear()
 
 
 def write_png_content_to_file(base_file_name, image_content):
-    with open(os.path.join(get_resources_path(), base_file_name + PNG_REF_SUFFIX), "wb") as file:
+    with open(os.path.join(get_resources_path(), base_file_name + PNG_REF_SUFFIX), "wb", buffering=FILE_BUFFER_SIZE) as file:
         file.write(image_content)
+    get_png_content_from_file_name.cache_clear()
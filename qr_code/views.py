@@ -1,11 +1,25 @@
-import base64
 import binascii
 import functools
+import hashlib
+import hmac
+import inspect
+import re
+
+try:
+    # Optional SIMD accelerated base64 codec with the same API as the standard library module.
+    import pybase64 as _b64  # type: ignore[import-not-found]
+except ImportError:
+    import base64 as _b64  # type: ignore[no-redef]
 
 from django.conf import settings
+from django.core.cache import caches
 from django.core.exceptions import PermissionDenied, SuspiciousOperation
-from django.core.signing import BadSignature, Signer
+from django.core.signals import setting_changed
+from django.core.signing import BadSignature
+from django.dispatch import receiver
 from django.http import HttpResponse
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.text import compress_string
 from django.views.decorators.cache import cache_page
 from django.views.decorators.http import condition
 
@@ -14,12 +28,46 @@ from qr_code.qrcode.maker import make_qr_code_image
 from qr_code.qrcode.utils import QRCodeOptions
 from qr_code.qrcode.serve import (
     get_url_protection_options,
+    get_url_protection_signer,
     get_qr_url_protection_token,
     qr_code_etag,
     qr_code_last_modified,
     allows_external_request_from_user,
 )
 
+# Query arguments that carry the data or control the serving of the image rather than the QR code options.
+_EXCLUDED_QUERY_KEYS = frozenset(("bytes", "text", "int", "token", "cache_enabled", "url_signature_enabled"))
+# Query arguments that are read as QR code options.
+_QR_CODE_OPTIONS_KEYS = frozenset(inspect.signature(QRCodeOptions).parameters)
+_ALLOWED_QUERY_KEYS = _QR_CODE_OPTIONS_KEYS | _EXCLUDED_QUERY_KEYS
+# Content type of the served image for each supported image format.
+_IMAGE_FORMAT_CONTENT_TYPES = {"svg": "image/svg+xml", "png": "image/png"}
+_ACCEPTS_GZIP_RE = re.compile(r"\bgzip\b")
+
+
+@functools.lru_cache(maxsize=None)
+def _get_qr_code_cache_settings() -> tuple[str | None, int | None]:
+    """Returns the alias and the timeout of the cache used for QR codes, as read once from the settings."""
+    cache_alias = getattr(settings, "QR_CODE_CACHE_ALIAS", None)
+    if not cache_alias:
+        return None, None
+    return cache_alias, settings.CACHES[cache_alias]["TIMEOUT"]
+
+
+@receiver(setting_changed)
+def _clear_qr_code_cache_settings(*, setting, **kwargs) -> None:
+    if setting in ("QR_CODE_CACHE_ALIAS", "CACHES"):
+        _get_qr_code_cache_settings.cache_clear()
+
+
+def get_qr_code_cache_settings(request) -> tuple[str | None, int | None]:
+    """Returns the alias and the timeout of the cache used for QR codes, or (None, None) if caching is disabled for the
+    given request."""
+    cache_alias, timeout = _get_qr_code_cache_settings()
+    if cache_alias and request.GET.get("cache_enabled", "1") not in ("0", "false", "False"):
+        return cache_alias, timeout
+    return None, None
+
 
 def cache_qr_code():
     """
@@ -27,20 +75,20 @@ def cache_qr_code():
     """
 
     def decorator(view_func):
+        @functools.lru_cache(maxsize=1024)
+        def _get_cached_view(cache_alias, timeout, key_prefix):
+            # Build each page caching wrapper once, instead of wrapping the view again on every request.
+            return cache_page(timeout, cache=cache_alias, key_prefix=key_prefix)(view_func)
+
         @functools.wraps(view_func)
         def _wrapped_view(request, *view_args, **view_kwargs):
-            cache_enabled = int(request.GET.get("cache_enabled", 1)) == 1
-            if cache_enabled and hasattr(settings, "QR_CODE_CACHE_ALIAS") and settings.QR_CODE_CACHE_ALIAS:
+            cache_alias, timeout = get_qr_code_cache_settings(request)
+            if cache_alias:
                 # We found a cache alias for storing the generate qr code and cache is enabled, use it to cache the
                 # page.
-                timeout = settings.CACHES[settings.QR_CODE_CACHE_ALIAS]["TIMEOUT"]
-                key_prefix = "token={}.user_pk={}".format(
-                    request.GET.get("url_signature_enabled") or constants.DEFAULT_URL_SIGNATURE_ENABLED,
-                    request.user.pk,
-                )
-                response = cache_page(timeout, cache=settings.QR_CODE_CACHE_ALIAS, key_prefix=key_prefix)(view_func)(
-                    request, *view_args, **view_kwargs
-                )
+                url_signature_enabled = request.GET.get("url_signature_enabled") or constants.DEFAULT_URL_SIGNATURE_ENABLED
+                key_prefix = f"token={url_signature_enabled}.user_pk={request.user.pk}"
+                response = _get_cached_view(cache_alias, timeout, key_prefix)(request, *view_args, **view_kwargs)
             else:
                 # No cache alias for storing the generated qr code, call the view as is.
                 response = (view_func)(request, *view_args, **view_kwargs)
@@ -51,7 +99,53 @@ def cache_qr_code():
     return decorator
 
 
-@condition(etag_func=qr_code_etag, last_modified_func=qr_code_last_modified)
+def browser_cache_headers(view_func):
+    """
+    Decorator that sets the caching headers meant for browsers and intermediate caches.
+
+    It must wrap both the page cache, which would not store a private response and whose timeout would cap the max age,
+    and the conditional request handling, so that HTTP 304 responses carry the same headers.
+    """
+
+    @functools.wraps(view_func)
+    def _wrapped_view(request, *view_args, **view_kwargs):
+        response = view_func(request, *view_args, **view_kwargs)
+        _patch_browser_cache_headers(request, response)
+        return response
+
+    return _wrapped_view
+
+
+def _patch_browser_cache_headers(request, response) -> None:
+    # Replace the expiry date and the max age set by the page cache, patch_cache_control() would keep the smaller max
+    # age.
+    del response["Expires"]
+    del response["Cache-Control"]
+    if request.GET.get("token"):
+        # The signed token makes the URL content-addressed, the image can be stored by any intermediate cache.
+        patch_cache_control(response, public=True, max_age=31536000, immutable=True)
+    else:
+        # Access without token depends on the user, only the browser may store the image.
+        patch_cache_control(response, private=True, max_age=0, must_revalidate=True)
+    patch_vary_headers(response, ("Accept-Encoding",))
+
+
+def _is_gzip_enabled(request, qr_code_options: QRCodeOptions) -> bool:
+    # SVG is highly compressible XML, compress it once along with the image (PNG is already compressed).
+    return accepts_gzip(request) and qr_code_options.image_format == "svg"
+
+
+def _qr_code_image_etag(request) -> str:
+    etag = qr_code_etag(request)
+    if _is_gzip_enabled(request, get_qr_code_option_from_request(request)):
+        # The compressed representation is not byte-identical to the uncompressed one, weaken the ETag like
+        # GZipMiddleware does.
+        return f"W/{etag}"
+    return etag
+
+
+@browser_cache_headers
+@condition(etag_func=_qr_code_image_etag, last_modified_func=qr_code_last_modified)
 @cache_qr_code()
 def serve_qr_code_image(request) -> HttpResponse:
     """Serve an image that represents the requested QR code.
@@ -67,6 +161,13 @@ def serve_qr_code_image(request) -> HttpResponse:
     from your application and addressed to your application). The authentication uses a HMAC to sign the request query
     arguments. The authentication code is passed as a query argument named `token` which is automatically generated
     by `qr_url_from_text` or `qr_url_from_data`.
+
+    Any other query argument is rejected with *HTTP 400 Bad Request*.
+
+    Conditional requests are answered with *HTTP 304 Not Modified* before the image is generated, since the ETag and
+    the last modification date only depend on the requested URL and on the QR code generation version.
+
+    SVG images are served gzip compressed to clients that accept this content encoding.
     """
     qr_code_options = get_qr_code_option_from_request(request)
     # Handle image access protection (we do not allow external requests for anyone).
@@ -74,34 +175,82 @@ def serve_qr_code_image(request) -> HttpResponse:
     force_text = False
     if "bytes" in request.GET:
         try:
-            data = base64.b64decode(request.GET.get("bytes", b""))
+            data = _b64.b64decode(request.GET.get("bytes", b""), validate=True)
         except binascii.Error:
             raise SuspiciousOperation("Invalid base64 encoded data.")
     elif "int" in request.GET:
-        try:
-            data = int(request.GET.get("int", None))  # type: ignore
-        except (ValueError, TypeError):
+        raw_int = request.GET["int"]
+        # Check the value upfront rather than catching the exception raised by int().
+        if not raw_int.removeprefix("-").isdecimal():
             raise SuspiciousOperation("Invalid integer value.")
+        data = int(raw_int)  # type: ignore
     else:
         try:
-            data = base64.b64decode(request.GET.get("text", "")).decode("utf-8")  # type: ignore
+            data = _b64.b64decode(request.GET.get("text", ""), validate=True).decode("utf-8")  # type: ignore
             force_text = True
         except binascii.Error:
             raise SuspiciousOperation("Invalid base64 encoded text.")
         except UnicodeDecodeError:
             raise SuspiciousOperation("Invalid UTF-8 encoded text.")
+    gzip_enabled = _is_gzip_enabled(request, qr_code_options)
+    img = _make_qr_code_image_with_cache(request, data, qr_code_options, force_text, gzip_enabled)
+    response = HttpResponse(content=img, content_type=_IMAGE_FORMAT_CONTENT_TYPES[qr_code_options.image_format])
+    response["Content-Length"] = str(len(img))
+    if gzip_enabled:
+        response["Content-Encoding"] = "gzip"
+    # The page cache must store the compressed and uncompressed images under distinct keys.
+    patch_vary_headers(response, ("Accept-Encoding",))
+    return response
+
+
+def _make_qr_code_image_with_cache(request, data, qr_code_options: QRCodeOptions, force_text: bool, gzip_enabled: bool) -> bytes:
+    """Return the image bytes for the QR code, sharing them across URLs that request the same QR code.
+
+    The key is computed from the data and the rendering options only, so that URLs that differ by their token or by
+    the order of their query arguments reuse the same rendered image.
+    """
+    cache_alias, _timeout = get_qr_code_cache_settings(request)
+    if not cache_alias:
+        return _make_qr_code_image(data, qr_code_options, force_text, gzip_enabled)
+    options_query = sorted((k, v) for k, v in request.GET.items() if k not in _EXCLUDED_QUERY_KEYS)
+    key_data = repr((type(data).__name__, data, force_text, gzip_enabled, options_query)).encode("utf-8")
+    key = "qr_code_image:" + hashlib.blake2b(key_data, digest_size=16).hexdigest()
+    cache = caches[cache_alias]
+    img = cache.get(key)
+    if img is None:
+        img = _make_qr_code_image(data, qr_code_options, force_text, gzip_enabled)
+        cache.set(key, img)
+    return img
+
+
+def _make_qr_code_image(data, qr_code_options: QRCodeOptions, force_text: bool, gzip_enabled: bool) -> bytes:
     img = make_qr_code_image(data, qr_code_options=qr_code_options, force_text=force_text)
-    return HttpResponse(content=img, content_type="image/svg+xml" if qr_code_options.image_format == "svg" else "image/png")
+    if gzip_enabled:
+        # The compressed image is deterministic (fixed modification time).
+        img = compress_string(img)
+    return img
+
+
+def accepts_gzip(request) -> bool:
+    """Tells whether the client accepts gzip compressed responses."""
+    return bool(_ACCEPTS_GZIP_RE.search(request.META.get("HTTP_ACCEPT_ENCODING", "")))
 
 
 def get_qr_code_option_from_request(request) -> QRCodeOptions:
-    request_query = request.GET.dict()
-    for key in ("bytes", "text", "int", "token", "cache_enabled"):
-        request_query.pop(key, None)
+    unknown_keys = request.GET.keys() - _ALLOWED_QUERY_KEYS
+    if unknown_keys:
+        raise SuspiciousOperation(f"Unknown query arguments: {', '.join(sorted(unknown_keys))}.")
+    return _build_qr_code_options(frozenset((k, request.GET[k]) for k in _QR_CODE_OPTIONS_KEYS & request.GET.keys()))
+
+
+@functools.lru_cache(maxsize=1024)
+def _build_qr_code_options(options_items: frozenset) -> QRCodeOptions:
+    """Build the QR code options from the query items, sharing instances between requests with the same options."""
+    request_query = dict(options_items)
     # Force typing for booleans.
-    request_query["micro"] = int(request_query.get("micro", 0)) == 1
-    request_query["eci"] = int(request_query.get("eci", 0)) == 1
-    request_query["boost_error"] = int(request_query.get("boost_error", 0)) == 1
+    request_query["micro"] = request_query.get("micro", "0") == "1"
+    request_query["eci"] = request_query.get("eci", "0") == "1"
+    request_query["boost_error"] = request_query.get("boost_error", "0") == "1"
     return QRCodeOptions(**request_query)
 
 
@@ -117,13 +266,26 @@ def check_image_access_permission(request, qr_code_options) -> None:
 
 def check_url_signature_token(qr_code_options, token) -> None:
     url_protection_options = get_url_protection_options()
-    signer = Signer(key=url_protection_options[constants.SIGNING_KEY], salt=url_protection_options[constants.SIGNING_SALT])
+    # The expected protection string is the token computed for the options with the random part left empty.
+    options_protection_prefix = get_qr_url_protection_token(qr_code_options, "")
+    if not _is_valid_url_signature_token(
+        token, url_protection_options[constants.SIGNING_KEY], url_protection_options[constants.SIGNING_SALT], options_protection_prefix
+    ):
+        raise PermissionDenied("Wrong token signature or request query does not match protection token.")
+
+
+@functools.lru_cache(maxsize=4096)
+def _is_valid_url_signature_token(token: str, signing_key: str, signing_salt: str, options_protection_prefix: str) -> bool:
+    """Tells whether the signed token is valid for the given options, caching the result for repeated requests."""
+    signer = get_url_protection_signer(signing_key, signing_salt)
     try:
         # Check signature.
         url_protection_string = signer.unsign(token)
-        # Check that the given token matches the request parameters.
-        random_token = url_protection_string.split(".")[-1]
-        if get_qr_url_protection_token(qr_code_options, random_token) != url_protection_string:
-            raise PermissionDenied("Request query does not match protection token.")
     except BadSignature:
-        raise PermissionDenied("Wrong token signature.")
+        return False
+    # Check that the given token matches the request parameters.
+    random_token = url_protection_string.split(".")[-1]
+    # Use a constant-time comparison to avoid leaking information through response timing. Compare bytes since the
+    # options come from the query and may contain non-ASCII characters.
+    expected_protection_string = options_protection_prefix + random_token
+    return hmac.compare_digest(expected_protection_string.encode("utf-8"), url_protection_string.encode("utf-8"))
@@ -0,0 +1,27 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from qr_code_demo.views import render_index_page
+
+
+class Command(BaseCommand):
+    help = "Render the demo home page into a static HTML file that can be served without hitting Django."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--output",
+            help="Path of the HTML file to write. Defaults to qr_code_demo/index.html in STATIC_ROOT.",
+        )
+
+    def handle(self, *args, **options):
+        output = options["output"]
+        if output is None:
+            if not settings.STATIC_ROOT:
+                raise CommandError("STATIC_ROOT is not set, use --output to choose where to write the demo page.")
+            output = os.path.join(settings.STATIC_ROOT, "qr_code_demo", "index.html")
+        os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+        with open(output, "wb") as f:
+            f.write(render_index_page())
+        self.stdout.write(self.style.SUCCESS(f"Demo page written to {output}"))
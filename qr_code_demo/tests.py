@@ -0,0 +1,73 @@
+"""Tests for the demo application."""
+import gzip
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+
+
+class TestIndex(SimpleTestCase):
+    def test_index(self):
+        response = self.client.get(reverse("qr_code_demo:index"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "text/html; charset=utf-8")
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertEqual(set(response["Cache-Control"].split(", ")), {"public", "max-age=86400"})
+        self.assertEqual(response["Vary"], "Accept-Encoding")
+        self.assertTrue(response.has_header("ETag"))
+        self.assertIn(b"<title>Demo Site of django-qr-code</title>", response.content)
+
+    def test_index_with_gzip_encoding(self):
+        response = self.client.get(reverse("qr_code_demo:index"))
+        gzip_response = self.client.get(reverse("qr_code_demo:index"), HTTP_ACCEPT_ENCODING="gzip, deflate")
+        self.assertEqual(gzip_response.status_code, 200)
+        self.assertEqual(gzip_response["Content-Encoding"], "gzip")
+        self.assertEqual(gzip_response["Vary"], "Accept-Encoding")
+        self.assertEqual(gzip.decompress(gzip_response.content), response.content)
+        self.assertNotEqual(gzip_response["ETag"], response["ETag"])
+
+    def test_index_not_modified(self):
+        for accept_encoding in ("", "gzip"):
+            response = self.client.get(reverse("qr_code_demo:index"), HTTP_ACCEPT_ENCODING=accept_encoding)
+            response = self.client.get(reverse("qr_code_demo:index"), HTTP_ACCEPT_ENCODING=accept_encoding, HTTP_IF_NONE_MATCH=response["ETag"])
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response.content, b"")
+            self.assertEqual(set(response["Cache-Control"].split(", ")), {"public", "max-age=86400"})
+            self.assertEqual(response["Vary"], "Accept-Encoding")
+
+    @override_settings(DEBUG=True)
+    def test_index_in_debug_mode(self):
+        response = self.client.get(reverse("qr_code_demo:index"), HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(response["Cache-Control"], "no-cache")
+        self.assertEqual(response["Vary"], "Accept-Encoding")
+        self.assertFalse(response.has_header("ETag"))
+        self.assertIn(b"<title>Demo Site of django-qr-code</title>", gzip.decompress(response.content))
+
+
+class TestRenderDemoCommand(SimpleTestCase):
+    def test_render_demo_with_output(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output = os.path.join(tmp_dir, "demo", "index.html")
+            call_command("render_demo", output=output, stdout=StringIO())
+            with open(output, "rb") as f:
+                self.assertIn(b"<title>Demo Site of django-qr-code</title>", f.read())
+
+    def test_render_demo_to_static_root(self):
+        with tempfile.TemporaryDirectory() as tmp_dir, override_settings(STATIC_ROOT=tmp_dir):
+            call_command("render_demo", stdout=StringIO())
+            self.assertTrue(os.path.isfile(os.path.join(tmp_dir, "qr_code_demo", "index.html")))
+
+    @override_settings(STATIC_ROOT=None)
+    def test_render_demo_without_static_root(self):
+        with self.assertRaises(CommandError):
+            call_command("render_demo", stdout=StringIO())
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output = os.path.join(tmp_dir, "index.html")
+            call_command("render_demo", output=output, stdout=StringIO())
+            self.assertTrue(os.path.isfile(output))
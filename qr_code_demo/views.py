@@ -1,5 +1,15 @@
+import functools
+import hashlib
 from datetime import date, datetime
-from django.shortcuts import render
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.text import compress_string
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+from django.views.decorators.vary import vary_on_headers
 
 from qr_code.qrcode.utils import (
     MeCard,
@@ -14,6 +24,7 @@ from qr_code.qrcode.utils import (
     EventStatus,
     EventTransparency,
 )
+from qr_code.views import accepts_gzip
 
 # Use a ContactDetail instance to encapsulate the detail of the contact.
 DEMO_MECARD_CONTACT = MeCard(
@@ -66,8 +77,64 @@ DEMO_WIFI = WifiConfig(ssid="my-wifi", authentication=WifiConfig.AUTHENTICATION.
 
 DEMO_COORDINATES = Coordinates(latitude=586000.32, longitude=250954.19, altitude=500)
 
+DEMO_EMAIL = Email(
+    to="john.doe@domain.com",
+    cc=("bob.doe@domain.com", "alice.doe@domain.com"),
+    bcc="secret@domain.com",
+    subject="Important message",
+    body="This is a very important message!",
+)
+
+DEMO_EPC_DATA = EpcData(
+    name="Wikimedia Foerdergesellschaft", iban="DE33100205000001194700", amount=20, text="To Wikipedia, From Gérard Boéchat"
+)
+
 DEMO_OPTIONS = QRCodeOptions(size="t", border=6, error_correction="L")
 
+DEMO_SHIFT_JS_ENCODED = "ウェブサイトにおける文字コードの割合、UTF-8が90％超え。Shift_JISやEUC-JPは？".encode("shift-jis")
+DEMO_KANJI_ENCODED = "義務教育諸学校教科用図書検定基準".encode("cp932")
+
+
+# The context only holds constants, build it once.
+_INDEX_CONTEXT = dict(
+    mecard_contact=DEMO_MECARD_CONTACT,
+    vcard_contact=DEMO_VCARD_CONTACT,
+    wifi_config=DEMO_WIFI,
+    video_id="J9go2nj6b3M",
+    google_maps_coordinates=DEMO_COORDINATES,
+    geolocation_coordinates=DEMO_COORDINATES,
+    email=DEMO_EMAIL,
+    epc_data=DEMO_EPC_DATA,
+    event=DEMO_EVENT,
+    shift_js_encoded=DEMO_SHIFT_JS_ENCODED,
+    kanji_encoded=DEMO_KANJI_ENCODED,
+    options_example=DEMO_OPTIONS,
+)
+
+
+def render_index_page() -> bytes:
+    """Render the home page of this demo app."""
+    return render_to_string("qr_code_demo/index.html", context=_INDEX_CONTEXT).encode()
+
+
+def _make_index_pages() -> dict[bool, tuple[bytes, str]]:
+    """Returns the content of the home page and its ETag, keyed by whether the content is gzip compressed."""
+    page = render_index_page()
+    # The compressed bytes, hence the ETag, are stable (fixed modification time).
+    compressed_page = compress_string(page)
+    return {
+        gzip_enabled: (content, f'"{hashlib.blake2b(content, digest_size=16).hexdigest()}"')
+        for gzip_enabled, content in ((False, page), (True, compressed_page))
+    }
+
+
+# The page only depends on module-level constants, hence it is rendered once per process.
+_get_index_pages = functools.cache(_make_index_pages)
+
+
+def _index_page_etag(request) -> str:
+    return _get_index_pages()[accepts_gzip(request)][1]
+
 
 def index(request):
     """
@@ -75,31 +142,33 @@ def index(request):
 
     :param request:
     :return: HTTP response providing the home page of this demo app.
+
+    The page is served gzip compressed to clients that accept this content encoding.
     """
+    if settings.DEBUG:
+        # Render the page on each request in debug mode, so that template edits show up with runserver.
+        return _serve_fresh_index_page(request)
+    return _serve_prerendered_index_page(request)
+
+
+def _serve_fresh_index_page(request):
+    page = render_index_page()
+    gzip_enabled = accepts_gzip(request)
+    response = HttpResponse(compress_string(page) if gzip_enabled else page, content_type="text/html; charset=utf-8")
+    if gzip_enabled:
+        response["Content-Encoding"] = "gzip"
+    patch_vary_headers(response, ("Accept-Encoding",))
+    # Make the browser fetch the page again instead of reusing a copy rendered before a template edit.
+    patch_cache_control(response, no_cache=True)
+    return response
+
 
-    # Build context for rendering QR codes.
-    context = dict(
-        mecard_contact=DEMO_MECARD_CONTACT,
-        vcard_contact=DEMO_VCARD_CONTACT,
-        wifi_config=DEMO_WIFI,
-        video_id="J9go2nj6b3M",
-        google_maps_coordinates=DEMO_COORDINATES,
-        geolocation_coordinates=DEMO_COORDINATES,
-        email=Email(
-            to="john.doe@domain.com",
-            cc=("bob.doe@domain.com", "alice.doe@domain.com"),
-            bcc="secret@domain.com",
-            subject="Important message",
-            body="This is a very important message!",
-        ),
-        epc_data=EpcData(
-            name="Wikimedia Foerdergesellschaft", iban="DE33100205000001194700", amount=20, text="To Wikipedia, From Gérard Boéchat"
-        ),
-        event=DEMO_EVENT,
-        shift_js_encoded="ウェブサイトにおける文字コードの割合、UTF-8が90％超え。Shift_JISやEUC-JPは？".encode("shift-jis"),
-        kanji_encoded="義務教育諸学校教科用図書検定基準".encode("cp932"),
-        options_example=DEMO_OPTIONS,
-    )
-
-    # Render the index page.
-    return render(request, "qr_code_demo/index.html", context=context)
+@cache_control(public=True, max_age=60 * 60 * 24)
+@vary_on_headers("Accept-Encoding")
+@condition(etag_func=_index_page_etag)
+def _serve_prerendered_index_page(request):
+    gzip_enabled = accepts_gzip(request)
+    response = HttpResponse(_get_index_pages()[gzip_enabled][0], content_type="text/html; charset=utf-8")
+    if gzip_enabled:
+        response["Content-Encoding"] = "gzip"
+    return response
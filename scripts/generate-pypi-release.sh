@@ -1,8 +1,8 @@
 #!/usr/bin/env bash
 (
     python -m pip install --upgrade pip
-    pip install --upgrade setuptools wheel twine
+    pip install --upgrade build twine
     cd ../
     rm -r build/ dist/ django_qr_code.egg-info/
-    python setup.py check && python setup.py sdist && python setup.py bdist_wheel && twine upload dist/*
+    python -m build && twine check dist/* && twine upload dist/*
 )
\ No newline at end of file
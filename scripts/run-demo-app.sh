@@ -3,12 +3,14 @@ set -e
 
 cd ..
 
+DOCKER_COMPOSE_COMMAND="docker-compose -f docker-compose.yml -f docker-compose.demo.yml"
+
 echo --- Build stage test container
-docker-compose down || true
-docker-compose build --build-arg PYTHON_VERSION=3.11
+${DOCKER_COMPOSE_COMMAND} down || true
+${DOCKER_COMPOSE_COMMAND} build --build-arg PYTHON_VERSION=3.11
 
 echo --- Fire up staging site
-docker-compose up -d --remove-orphans
+${DOCKER_COMPOSE_COMMAND} up -d --remove-orphans
 
 echo --- Listing containers
-docker-compose ps
+${DOCKER_COMPOSE_COMMAND} ps